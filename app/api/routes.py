@@ -1,20 +1,32 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks
 from fastapi.responses import JSONResponse
-import json
 from typing import Dict, Any
 
-from app.core.file_processor import identify_file_type, process_file
+from app.utils import json_utils
+from app.core.file_processor import OcrMode, identify_file_type, process_file, read_upload
 from app.schemas.validation import validate_schema
-from app.langflow.extraction_flow import run_extraction_flow
+from app.langflow.extraction_flow import arun_extraction_flow
 
 router = APIRouter()
 
+class ExtractionResponse(JSONResponse):
+    """
+    JSON response serialized with orjson when it is installed.
+    
+    Data that orjson cannot serialize, like integers wider than 64 bits in
+    long account or invoice numbers, falls back to the standard library.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return json_utils.dumps(content).encode("utf-8")
+
 
 @router.post("/extract")
 async def extract_data(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     schema: str = Form(...),
+    ocr_mode: OcrMode = Form("auto"),
 ):
     """
     Extract structured data from a document based on the provided schema.
@@ -22,6 +34,7 @@ async def extract_data(
     Args:
         file: The document file (PDF, image, DOCX, etc.)
         schema: JSON string defining the data schema to extract
+        ocr_mode: When to OCR PDFs: "auto" (only scanned PDFs), "on" or "off"
     
     Returns:
         JSON response with extracted data matching the schema
@@ -29,37 +42,28 @@ async def extract_data(
     try:
         # Parse and validate schema
         try:
-            schema_dict = json.loads(schema)
+            schema_dict = json_utils.loads(schema)
             validate_schema(schema_dict)
-        except json.JSONDecodeError:
+        except json_utils.JSONDecodeError:
             raise HTTPException(
                 status_code=400, detail="Invalid schema format: not a valid JSON"
             )
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
 
-        # Check file size (limit to 10MB)
-        file_size = 0
-        file_content = await file.read()
-        file_size = len(file_content)
-        if file_size > 10 * 1024 * 1024:  # 10MB
-            raise HTTPException(
-                status_code=400, detail="File size exceeds the 10MB limit"
-            )
-        
-        # Reset file pointer for later processing
-        await file.seek(0)
+        # Read the file in chunks, rejecting it as soon as it exceeds the size limit
+        file_content = await read_upload(file)
         
-        # Identify file type
-        file_type = identify_file_type(file)
+        # Identify file type from its content
+        file_type = identify_file_type(file_content)
         
         # Process file based on its type
-        processed_text = await process_file(file, file_type)
+        processed_text = await process_file(file_content, file_type, ocr_mode)
         
         # Run extraction flow
-        result = run_extraction_flow(processed_text, schema_dict)
+        result = await arun_extraction_flow(processed_text, schema_dict)
         
-        return JSONResponse(
+        return ExtractionResponse(
             content=result,
             status_code=200
         )
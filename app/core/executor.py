@@ -0,0 +1,111 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+# Shared process pool for CPU-bound parsing work (OCR, PDF extraction)
+_cpu_pool: Optional[ProcessPoolExecutor] = None
+
+# Number of worker processes in the shared pool, reused when it is replaced
+_cpu_pool_workers: Optional[int] = None
+
+
+def start_cpu_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Start the shared process pool, if it is not already running.
+    
+    Args:
+        max_workers: Number of worker processes (defaults to the CPU count)
+    
+    Returns:
+        ProcessPoolExecutor: The shared process pool
+    """
+    global _cpu_pool, _cpu_pool_workers
+    if _cpu_pool is None:
+        _cpu_pool_workers = max_workers or os.cpu_count()
+        _cpu_pool = ProcessPoolExecutor(max_workers=_cpu_pool_workers)
+    return _cpu_pool
+
+
+def shutdown_cpu_pool() -> None:
+    """Shut down the shared process pool, waiting for running work to finish."""
+    global _cpu_pool
+    if _cpu_pool is not None:
+        _cpu_pool.shutdown(wait=True)
+        _cpu_pool = None
+
+
+def get_cpu_pool() -> Optional[ProcessPoolExecutor]:
+    """Get the shared process pool, or None if it has not been started."""
+    return _cpu_pool
+
+
+def get_cpu_pool_size() -> int:
+    """Get the number of CPU-bound tasks that can run at once (the pool's workers, or the CPU count)."""
+    if _cpu_pool is not None:
+        return _cpu_pool_workers
+    return os.cpu_count() or 1
+
+
+def _replace_broken_pool(broken_pool: ProcessPoolExecutor) -> ProcessPoolExecutor:
+    """
+    Replace the shared pool with a new one of the same size after a worker died.
+    
+    Args:
+        broken_pool: The pool that reported BrokenProcessPool
+    
+    Returns:
+        ProcessPoolExecutor: The shared process pool now in use
+    """
+    global _cpu_pool
+    # Concurrent callers may see the same broken pool; only the first replaces it
+    if _cpu_pool is broken_pool:
+        broken_pool.shutdown(wait=False)
+        _cpu_pool = ProcessPoolExecutor(max_workers=_cpu_pool_workers)
+    return _cpu_pool
+
+
+def _call_in_worker(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Call a function in a worker, re-raising any failure as a RuntimeError.
+    
+    Exceptions are pickled back to the parent, and one that cannot be
+    unpickled (e.g. an __init__ taking no arguments, as in pytesseract's
+    TesseractNotFoundError) breaks the whole pool.
+    """
+    try:
+        return func(*args)
+    except Exception as e:
+        raise RuntimeError(str(e)) from e
+
+
+async def run_cpu_bound(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a CPU-bound function off the event loop.
+    
+    The function runs in the shared process pool, or in the loop's default
+    thread pool when the process pool has not been started (e.g. outside the app).
+    Use functools.partial to pass keyword arguments.
+    
+    If a worker dies (e.g. killed for running out of memory), every task in
+    the pool fails; the pool is then replaced and the call retried once.
+    
+    Args:
+        func: Picklable module-level function to run
+        *args: Positional arguments for the function
+    
+    Returns:
+        Any: The function's return value
+    
+    Raises:
+        RuntimeError: If the function raised, with the original message
+        BrokenProcessPool: If a worker died again on the retry
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_cpu_pool()
+    try:
+        return await loop.run_in_executor(pool, _call_in_worker, func, *args)
+    except BrokenProcessPool:
+        pool = _replace_broken_pool(pool)
+        return await loop.run_in_executor(pool, _call_in_worker, func, *args)
@@ -1,62 +1,106 @@
+import io
 import os
 from fastapi import UploadFile, HTTPException
 from typing import Literal, Optional
 
-from app.parsers.pdf_parser import extract_text_from_pdf
+from app.parsers.pdf_parser import OcrMode, extract_text_from_pdf
 from app.parsers.image_parser import extract_text_from_image
 from app.parsers.docx_parser import extract_text_from_docx
+from app.utils.document_processor import sniff_file_type, SNIFF_HEADER_SIZE
 
 # Define supported file types
 FileType = Literal["pdf", "image", "docx", "unknown"]
 
+# Size of each read when streaming an upload into memory
+UPLOAD_CHUNK_SIZE = 64 * 1024
 
-def identify_file_type(file: UploadFile) -> FileType:
+
+def get_max_file_size() -> int:
     """
-    Identify the type of the uploaded file based on its extension and content.
+    Get the maximum accepted upload size in bytes.
+    
+    Returns:
+        int: Limit taken from MAX_FILE_SIZE_MB (defaults to 10MB)
+    """
+    return int(os.getenv("MAX_FILE_SIZE_MB", "10")) * 1024 * 1024
+
+
+async def read_upload(file: UploadFile, max_size: Optional[int] = None) -> bytes:
+    """
+    Read an uploaded file in chunks, aborting as soon as it exceeds the size limit.
     
     Args:
         file: The uploaded file
+        max_size: Maximum number of bytes to accept (defaults to get_max_file_size())
     
     Returns:
-        FileType: The identified file type ("pdf", "image", "docx", or "unknown")
+        bytes: The full file content
+    
+    Raises:
+        HTTPException: 413 if the file is larger than max_size
     """
-    # Extract file extension
-    _, extension = os.path.splitext(file.filename)
-    extension = extension.lower()
+    if max_size is None:
+        max_size = get_max_file_size()
     
-    # Check extension
-    if extension == ".pdf":
-        return "pdf"
-    elif extension in [".jpg", ".jpeg", ".png", ".tiff", ".bmp", ".gif"]:
-        return "image"
-    elif extension == ".docx":
-        return "docx"
-    else:
-        # Could implement content-based detection for ambiguous cases
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported file type: {extension}. Please upload a PDF, image, or DOCX file."
-        )
+    buffer = io.BytesIO()
+    size = 0
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_size:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File size exceeds the {max_size // (1024 * 1024)}MB limit"
+            )
+        buffer.write(chunk)
+    
+    return buffer.getvalue()
 
 
-async def process_file(file: UploadFile, file_type: FileType) -> str:
+def identify_file_type(content: bytes) -> FileType:
+    """
+    Identify the type of the uploaded file based on its content.
+    
+    Args:
+        content: The uploaded file content
+    
+    Returns:
+        FileType: The identified file type ("pdf", "image", or "docx")
+    
+    Raises:
+        HTTPException: 400 if the content is not a supported file type
+    """
+    # Detect the type from the leading bytes (libmagic or file signatures)
+    file_type = sniff_file_type(content[:SNIFF_HEADER_SIZE])
+    if file_type in ("pdf", "image", "docx"):
+        return file_type
+    raise HTTPException(
+        status_code=400,
+        detail="Unsupported file type. Please upload a PDF, image, or DOCX file."
+    )
+
+
+async def process_file(content: bytes, file_type: FileType, ocr_mode: OcrMode = "auto") -> str:
     """
     Process the file based on its type and extract text content.
     
     Args:
-        file: The uploaded file
+        content: The uploaded file content
         file_type: The identified file type
+        ocr_mode: When to OCR PDFs ("auto", "on" or "off"); images are always OCRed
     
     Returns:
         str: Extracted text from the file
     """
     try:
         if file_type == "pdf":
-            return await extract_text_from_pdf(file)
+            return await extract_text_from_pdf(content, ocr_mode)
         elif file_type == "image":
-            return await extract_text_from_image(file)
+            return await extract_text_from_image(content)
         elif file_type == "docx":
-            return await extract_text_from_docx(file)
+            return await extract_text_from_docx(content)
         else:
             raise ValueError(f"Unsupported file type: {file_type}")
     except Exception as e:
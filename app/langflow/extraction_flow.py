@@ -1,36 +1,377 @@
-from typing import Dict, Any, List, Callable
+from typing import Dict, Any, List, Callable, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import copy
+import functools
+import hashlib
 import os
-from langgraph.graph import StateGraph
+import re
+import threading
+import time
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from langchain.schema.runnable import RunnablePassthrough
-import json
+from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
 
+from app.utils import json_utils
 
-def create_extraction_nodes():
+# Use the model's real tokenizer for truncation when available
+try:
+    import tiktoken
+    TIKTOKEN_SUPPORT = True
+except ImportError:
+    TIKTOKEN_SUPPORT = False
+
+
+# Token budget for the whole extraction prompt (conservative limit for context)
+MAX_PROMPT_TOKENS = 8000
+
+# Appended to documents cut down to fit the token budget
+TRUNCATION_NOTICE = "\n[Document truncated due to length]"
+
+# Extraction prompt template
+EXTRACTION_TEMPLATE = """
+    You are a document information extraction expert. Your task is to extract structured information from the document text according to the specified schema.
+    
+    # Document Text:
+    {processed_text}
+    
+    # Target Schema:
+    {schema_prompt}
+    
+    # Instructions:
+    1. Extract all fields defined in the schema from the document.
+    2. For each field, provide the exact value found in the document.
+    3. Maintain the correct data type for each field as defined in the schema.
+    4. If a field cannot be found in the document, use null for that field.
+    5. Return ONLY a valid JSON object matching the schema, nothing else.
+    
+    # Extracted JSON (ensure valid JSON format):
+    """
+
+EXTRACTION_PROMPT = ChatPromptTemplate.from_template(EXTRACTION_TEMPLATE)
+
+# Name of the tool the LLM is forced to call with the extracted fields
+EXTRACTION_TOOL_NAME = "record_extracted_data"
+
+# Markdown code fence (optionally tagged json) the LLM may wrap its JSON answer in
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+
+# JSON Schema the LLM is asked to follow for each schema field type
+FIELD_JSON_SCHEMAS = {
+    "string": {"type": "string"},
+    "number": {"type": "number"},
+    "boolean": {"type": "boolean"},
+    "date": {"type": "string", "format": "date"},
+    "array": {"type": "array", "items": {}},
+    "object": {"type": "object"},
+}
+
+# Extraction flow, built on first use and shared across requests
+_compiled_graph = None
+_graph_lock = threading.Lock()
+
+# Seconds to wait before retrying a tokenizer load that failed
+ENCODING_RETRY_SECONDS = 300
+
+# tiktoken encodings loaded so far, and the time of the last failed load, by model name
+_encodings: Dict[str, Any] = {}
+_encoding_failures: Dict[str, float] = {}
+_encoding_lock = threading.Lock()
+
+# LRU cache of LLM extraction results, keyed by document, schema and model
+_extraction_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_model_name() -> str:
     """
-    Create the nodes for the LangGraph extraction flow.
+    Get the name of the LLM used for extraction.
     
     Returns:
-        Dict containing the flow nodes
+        str: Model name from OPENAI_MODEL_NAME (defaults to gpt-4)
+    """
+    return os.getenv("OPENAI_MODEL_NAME", "gpt-4")
+
+
+def make_cache_key(processed_text: str, schema: Dict[str, Any], model_name: str) -> str:
+    """
+    Build a content-addressable key for an extraction request.
+    
+    Args:
+        processed_text: Preprocessed document text
+        schema: Data schema to extract
+        model_name: Name of the LLM doing the extraction
+    
+    Returns:
+        str: SHA-256 hex digest identifying the request
+    """
+    digest = hashlib.sha256()
+    for part in (model_name, processed_text, json_utils.dumps(schema, sort_keys=True)):
+        digest.update(hashlib.sha256(part.encode("utf-8")).digest())
+    return digest.hexdigest()
+
+
+def get_cached_extraction(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a previous extraction result.
+    
+    Args:
+        key: Cache key from make_cache_key()
+    
+    Returns:
+        A copy of the cached result, or None on a miss
+    """
+    with _cache_lock:
+        if key not in _extraction_cache:
+            return None
+        _extraction_cache.move_to_end(key)
+        return copy.deepcopy(_extraction_cache[key])
+
+
+def store_extraction(key: str, result: Dict[str, Any]) -> None:
+    """
+    Store an extraction result, evicting the least recently used entries.
+    
+    The cache size is set by EXTRACTION_CACHE_SIZE (0 disables caching).
+    
+    Args:
+        key: Cache key from make_cache_key()
+        result: Extracted data to cache
+    """
+    max_entries = int(os.getenv("EXTRACTION_CACHE_SIZE", "256"))
+    if max_entries <= 0:
+        return
+    
+    with _cache_lock:
+        _extraction_cache[key] = copy.deepcopy(result)
+        _extraction_cache.move_to_end(key)
+        while len(_extraction_cache) > max_entries:
+            _extraction_cache.popitem(last=False)
+
+
+def clear_extraction_cache() -> None:
+    """Remove all cached extraction results."""
+    with _cache_lock:
+        _extraction_cache.clear()
+
+
+def get_tool_parameters(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the JSON Schema of the extraction tool's arguments from a client schema.
+    
+    Every field is nullable, so values missing from the document come back
+    as null. Field names are used as given and keep the client's order.
+    
+    Args:
+        schema: Data schema to extract
+    
+    Returns:
+        Dict containing the JSON Schema of the tool arguments
+    """
+    properties = {}
+    for field, field_type in schema.items():
+        field_schema = dict(FIELD_JSON_SCHEMAS[field_type.lower()])
+        field_schema["type"] = [field_schema["type"], "null"]
+        properties[field] = field_schema
+    
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(schema),
+    }
+
+
+@functools.lru_cache(maxsize=256)
+def _render_schema_prompt(schema_items: Tuple[Tuple[str, Any], ...]) -> str:
+    """Render a schema, given as a tuple of its items, as indented JSON."""
+    return json_utils.dumps(dict(schema_items), indent=True)
+
+
+def get_schema_prompt(schema: Dict[str, Any]) -> str:
+    """
+    Format a schema for the extraction prompt.
+    
+    The fields keep the client's order. Rendered prompts are cached per schema.
+    
+    Args:
+        schema: Data schema to extract
+    
+    Returns:
+        str: Schema as indented JSON
+    """
+    return _render_schema_prompt(tuple(schema.items()))
+
+
+def get_extraction_tool(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the OpenAI tool definition the LLM fills in with the extracted data.
+    
+    Args:
+        schema: Data schema to extract
+    
+    Returns:
+        Dict containing the tool definition
+    """
+    return {
+        "type": "function",
+        "function": {
+            "name": EXTRACTION_TOOL_NAME,
+            "description": "Record the data extracted from the document.",
+            "parameters": get_tool_parameters(schema),
+        },
+    }
+
+
+def use_structured_output() -> bool:
+    """Check whether the LLM should return data through tool calling (OPENAI_STRUCTURED_OUTPUT)."""
+    return os.getenv("OPENAI_STRUCTURED_OUTPUT", "true").lower() == "true"
+
+
+def get_encoding(model_name: str):
+    """
+    Get the tiktoken encoding for a model, loaded once per model.
+    
+    Loading may download the BPE files, so call this off the event loop. After
+    a failed load, None is returned without retrying for ENCODING_RETRY_SECONDS;
+    while another thread is loading, None is returned instead of waiting.
+    
+    Args:
+        model_name: Name of the LLM
+    
+    Returns:
+        The tiktoken Encoding, or None if tiktoken is unavailable or the
+        encoding is not loaded (e.g. no network access for the BPE files)
+    """
+    if not TIKTOKEN_SUPPORT:
+        return None
+    
+    encoding = _encodings.get(model_name)
+    if encoding is not None:
+        return encoding
+    
+    # Don't retry a failed load (e.g. a download that timed out) on every request
+    failed_at = _encoding_failures.get(model_name)
+    if failed_at is not None and time.monotonic() - failed_at < ENCODING_RETRY_SECONDS:
+        return None
+    
+    if not _encoding_lock.acquire(blocking=False):
+        return None
+    
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            # Unknown model name, use the encoding of current OpenAI chat models
+            encoding = tiktoken.get_encoding("cl100k_base")
+        _encodings[model_name] = encoding
+        _encoding_failures.pop(model_name, None)
+        return encoding
+    except Exception:
+        _encoding_failures[model_name] = time.monotonic()
+        return None
+    finally:
+        _encoding_lock.release()
+
+
+def count_tokens(text: str, encoding: Any) -> int:
+    """
+    Count the tokens in a text.
+    
+    Args:
+        text: Text to measure
+        encoding: tiktoken encoding from get_encoding(), or None
+    
+    Returns:
+        int: Number of tokens (estimated from length without an encoding)
+    """
+    if encoding is None:
+        return len(text) // 4  # Rough character to token ratio
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, encoding: Any) -> str:
+    """
+    Truncate a text so it fits in a token budget.
+    
+    Args:
+        text: Text to truncate
+        max_tokens: Maximum number of tokens to keep
+        encoding: tiktoken encoding from get_encoding(), or None
+    
+    Returns:
+        str: The text, cut to max_tokens and marked as truncated if it was too long
+    """
+    max_tokens = max(max_tokens, 0)
+    
+    if encoding is None:
+        # Rough character to token ratio
+        if len(text) > max_tokens * 4:
+            return text[:max_tokens * 4] + TRUNCATION_NOTICE
+        return text
+    
+    # Every token covers at least one byte of UTF-8 (not one character: CJK
+    # characters and emoji often take several tokens), so short texts always fit
+    if len(text.encode("utf-8")) <= max_tokens:
+        return text
+    
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) > max_tokens:
+        return encoding.decode(tokens[:max_tokens]) + TRUNCATION_NOTICE
+    return text
+
+
+def create_llm() -> ChatOpenAI:
+    """
+    Create the chat model used for extraction.
+    
+    Returns:
+        ChatOpenAI: LLM configured from the environment
+    
+    Raises:
+        ValueError: If OPENAI_API_KEY is not set
     """
-    # Initialize the LLM
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable not set")
     
-    model_name = os.getenv("OPENAI_MODEL_NAME", "gpt-4")
-    llm = ChatOpenAI(api_key=api_key, model=model_name)
+    return ChatOpenAI(api_key=api_key, model=get_model_name())
+
+
+def create_extraction_nodes():
+    """
+    Create the nodes for the extraction flow.
+    
+    Returns:
+        Dict containing the flow nodes
+    """
+    # Initialize the LLM and the extraction chain once for all invocations
+    llm = create_llm()
+    model_name = get_model_name()
+    extraction_chain = EXTRACTION_PROMPT | llm
+    structured_output = use_structured_output()
+    
+    @functools.lru_cache(maxsize=256)
+    def structured_chain(schema_items: Tuple[Tuple[str, Any], ...]):
+        """Build the tool-calling chain for a schema given as a tuple of its items."""
+        tool = get_extraction_tool(dict(schema_items))
+        return (
+            EXTRACTION_PROMPT
+            | llm.bind_tools([tool], tool_choice=EXTRACTION_TOOL_NAME)
+            | JsonOutputKeyToolsParser(key_name=EXTRACTION_TOOL_NAME, first_tool_only=True)
+        )
     
     # Create document preprocessing node
     def preprocess_document(state: Dict[str, Any]) -> Dict[str, Any]:
         """Clean and prepare the document text for extraction."""
         text = state["document_text"]
         
-        # Truncate if text is too long (avoid token limits)
-        max_tokens = 8000  # Conservative limit for context
-        if len(text) > max_tokens * 4:  # Rough character to token ratio
-            text = text[:max_tokens * 4] + "\n[Document truncated due to length]"
+        # Truncate if text is too long (avoid token limits), leaving room
+        # for the prompt template and the schema
+        encoding = get_encoding(model_name)
+        overhead = count_tokens(EXTRACTION_TEMPLATE, encoding) + count_tokens(
+            get_schema_prompt(state.get("schema") or {}), encoding
+        )
+        text = truncate_to_tokens(text, MAX_PROMPT_TOKENS - overhead, encoding)
         
         # Basic cleaning
         text = text.replace("\x00", "")  # Remove null bytes
@@ -39,79 +380,107 @@ def create_extraction_nodes():
         state["processed_text"] = text
         return state
     
+    # Create async preprocessing node, used when the flow runs with ainvoke
+    async def apreprocess_document(state: Dict[str, Any]) -> Dict[str, Any]:
+        """Preprocess the document in a thread; tokenizing a large document would block the event loop."""
+        return await asyncio.to_thread(preprocess_document, state)
+    
     # Create schema preparation node
     def prepare_schema_prompt(state: Dict[str, Any]) -> Dict[str, Any]:
         """Format the schema for the extraction prompt."""
         schema = state["schema"]
         
         # Format schema into a string representation for the prompt
-        schema_str = json.dumps(schema, indent=2)
-        
-        state["schema_prompt"] = schema_str
+        state["schema_prompt"] = get_schema_prompt(schema)
         return state
     
-    # Create extraction prompt template
-    extraction_template = """
-    You are a document information extraction expert. Your task is to extract structured information from the document text according to the specified schema.
-    
-    # Document Text:
-    {processed_text}
-    
-    # Target Schema:
-    {schema_prompt}
-    
-    # Instructions:
-    1. Extract all fields defined in the schema from the document.
-    2. For each field, provide the exact value found in the document.
-    3. Maintain the correct data type for each field as defined in the schema.
-    4. If a field cannot be found in the document, use null for that field.
-    5. Return ONLY a valid JSON object matching the schema, nothing else.
-    
-    # Extracted JSON (ensure valid JSON format):
-    """
+    # Create LLM extraction node helpers shared by the sync and async paths
+    def parse_llm_response(state: Dict[str, Any], result_text: str, cache_key: str) -> Dict[str, Any]:
+        """Parse the LLM response into the extraction result and cache it."""
+        try:
+            # Extract JSON from the response if needed
+            match = _FENCE.search(result_text)
+            json_str = match.group(1).strip() if match else result_text.strip()
+            
+            extracted_data = json_utils.loads(json_str)
+        except Exception as e:
+            state["error"] = f"Failed to parse LLM response as JSON: {str(e)}"
+            state["extraction_result"] = {"error": "Failed to extract structured data"}
+            return state
+        
+        # Field values are checked and coerced one by one in validate_extraction
+        if isinstance(extracted_data, dict):
+            state["extraction_result"] = extracted_data
+            store_extraction(cache_key, extracted_data)
+        else:
+            state["error"] = f"LLM response is not a JSON object: {extracted_data!r}"
+            state["extraction_result"] = {"error": "Failed to extract structured data"}
+        
+        return state
     
-    extraction_prompt = ChatPromptTemplate.from_template(extraction_template)
+    def parse_tool_arguments(state: Dict[str, Any], arguments: Any, cache_key: str) -> Dict[str, Any]:
+        """Take the tool-call arguments as the extraction result and cache them."""
+        # Field values are checked and coerced one by one in validate_extraction
+        arguments = {} if arguments is None else arguments
+        if isinstance(arguments, dict):
+            state["extraction_result"] = arguments
+            store_extraction(cache_key, arguments)
+        else:
+            state["error"] = f"LLM tool call arguments are not a JSON object: {arguments!r}"
+            state["extraction_result"] = {"error": "Failed to extract structured data"}
+        
+        return state
     
     # Create LLM extraction node
     def extract_with_llm(state: Dict[str, Any]) -> Dict[str, Any]:
         """Use LLM to extract structured data according to schema."""
-        # Prepare the chain
-        chain = (
-            {"processed_text": RunnablePassthrough(), "schema_prompt": RunnablePassthrough()}
-            | extraction_prompt
-            | llm
-        )
+        # Reuse the result of an identical earlier request if we have one
+        cache_key = make_cache_key(state["processed_text"], state["schema"], model_name)
+        cached_result = get_cached_extraction(cache_key)
+        if cached_result is not None:
+            state["extraction_result"] = cached_result
+            return state
         
-        # Run the extraction
-        response = chain.invoke({
+        prompt_inputs = {
             "processed_text": state["processed_text"], 
             "schema_prompt": state["schema_prompt"]
-        })
+        }
         
-        # Extract the JSON from the response
-        result_text = response.content
+        # Run the extraction
+        if structured_output:
+            chain = structured_chain(tuple(state["schema"].items()))
+            return parse_tool_arguments(state, chain.invoke(prompt_inputs), cache_key)
         
-        try:
-            # Extract JSON from the response if needed
-            if "```json" in result_text:
-                json_str = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                json_str = result_text.split("```")[1].strip()
-            else:
-                json_str = result_text.strip()
-                
-            extracted_data = json.loads(json_str)
-            state["extraction_result"] = extracted_data
-        except Exception as e:
-            state["error"] = f"Failed to parse LLM response as JSON: {str(e)}"
-            state["extraction_result"] = {"error": "Failed to extract structured data"}
+        response = extraction_chain.invoke(prompt_inputs)
+        return parse_llm_response(state, response.content, cache_key)
+    
+    # Create async LLM extraction node, used when the flow runs with ainvoke
+    async def aextract_with_llm(state: Dict[str, Any]) -> Dict[str, Any]:
+        """Use the async LLM client to extract structured data according to schema."""
+        # Reuse the result of an identical earlier request if we have one
+        cache_key = make_cache_key(state["processed_text"], state["schema"], model_name)
+        cached_result = get_cached_extraction(cache_key)
+        if cached_result is not None:
+            state["extraction_result"] = cached_result
+            return state
         
-        return state
+        prompt_inputs = {
+            "processed_text": state["processed_text"], 
+            "schema_prompt": state["schema_prompt"]
+        }
+        
+        # Run the extraction without blocking the event loop
+        if structured_output:
+            chain = structured_chain(tuple(state["schema"].items()))
+            return parse_tool_arguments(state, await chain.ainvoke(prompt_inputs), cache_key)
+        
+        response = await extraction_chain.ainvoke(prompt_inputs)
+        return parse_llm_response(state, response.content, cache_key)
     
     # Create validation node
     def validate_extraction(state: Dict[str, Any]) -> Dict[str, Any]:
         """Validate the extracted data against the schema."""
-        if "error" in state:
+        if state.get("error"):
             return state
             
         schema = state["schema"]
@@ -141,51 +510,94 @@ def create_extraction_nodes():
     
     return {
         "preprocess_document": preprocess_document,
+        "apreprocess_document": apreprocess_document,
         "prepare_schema_prompt": prepare_schema_prompt,
         "extract_with_llm": extract_with_llm,
+        "aextract_with_llm": aextract_with_llm,
         "validate_extraction": validate_extraction
     }
 
 
-def build_extraction_graph() -> StateGraph:
+class ExtractionPipeline:
     """
-    Build the LangGraph extraction flow.
+    Runs the extraction nodes one after another on a shared state dict.
     
-    Returns:
-        StateGraph: The constructed flow graph
-    """
-    # Define the state schema
-    state_schema = {
-        "document_text": str,
-        "schema": dict,
-        "processed_text": str,
-        "schema_prompt": str,
-        "extraction_result": dict,
-        "error": str
-    }
+    The flow is a straight line with no branches or loops, so each node is
+    called directly instead of going through a LangGraph state machine.
+    """
     
-    # Create a new graph
-    graph = StateGraph(state_schema)
+    def __init__(self, steps: List[Tuple[str, Callable, Optional[Callable]]]):
+        """
+        Args:
+            steps: (name, node, async node or None) for each step, in order
+        """
+        self.steps = steps
     
-    # Get nodes
-    nodes = create_extraction_nodes()
+    def invoke(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Run every step synchronously and return the final state."""
+        for _, func, _ in self.steps:
+            state = func(state)
+        return state
     
-    # Add nodes to the graph
-    graph.add_node("preprocess_document", nodes["preprocess_document"])
-    graph.add_node("prepare_schema_prompt", nodes["prepare_schema_prompt"])
-    graph.add_node("extract_with_llm", nodes["extract_with_llm"])
-    graph.add_node("validate_extraction", nodes["validate_extraction"])
+    async def ainvoke(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Run every step, awaiting the async variant of a step when it has one."""
+        for _, func, afunc in self.steps:
+            state = await afunc(state) if afunc else func(state)
+        return state
+
+
+def build_extraction_graph() -> ExtractionPipeline:
+    """
+    Build the extraction flow.
     
-    # Define the edges
-    graph.add_edge("preprocess_document", "prepare_schema_prompt")
-    graph.add_edge("prepare_schema_prompt", "extract_with_llm")
-    graph.add_edge("extract_with_llm", "validate_extraction")
+    Returns:
+        ExtractionPipeline: The constructed flow
+    """
+    # Get nodes
+    nodes = create_extraction_nodes()
     
-    # Set the entry point
-    graph.set_entry_point("preprocess_document")
+    # Chain the nodes in order
+    return ExtractionPipeline([
+        ("preprocess_document", nodes["preprocess_document"], nodes.get("apreprocess_document")),
+        ("prepare_schema_prompt", nodes["prepare_schema_prompt"], None),
+        ("extract_with_llm", nodes["extract_with_llm"], nodes.get("aextract_with_llm")),
+        ("validate_extraction", nodes["validate_extraction"], None),
+    ])
+
+
+def get_extraction_graph() -> ExtractionPipeline:
+    """
+    Get the shared extraction flow, building it on first use.
     
-    # Compile the graph
-    return graph.compile()
+    Returns:
+        ExtractionPipeline: The extraction flow
+    """
+    global _compiled_graph
+    if _compiled_graph is None:
+        with _graph_lock:
+            if _compiled_graph is None:
+                _compiled_graph = build_extraction_graph()
+    return _compiled_graph
+
+
+def _initial_state(document_text: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the initial flow state for an extraction run."""
+    return {
+        "document_text": document_text,
+        "schema": schema,
+        "processed_text": "",
+        "schema_prompt": "",
+        "extraction_result": {},
+        "error": None
+    }
+
+
+def _final_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn the final flow state into the extraction result or an error."""
+    if "error" in result and result["error"]:
+        return {"error": result["error"]}
+    else:
+        return result["extraction_result"]
 
 
 def run_extraction_flow(document_text: str, schema: Dict[str, Any]) -> Dict[str, Any]:
@@ -199,27 +611,41 @@ def run_extraction_flow(document_text: str, schema: Dict[str, Any]) -> Dict[str,
     Returns:
         Dict containing the extracted data
     """
-    # Build the graph
-    graph = build_extraction_graph()
+    # Get the shared graph
+    graph = get_extraction_graph()
     
-    # Prepare initial state
-    initial_state = {
-        "document_text": document_text,
-        "schema": schema,
-        "processed_text": "",
-        "schema_prompt": "",
-        "extraction_result": {},
-        "error": None
-    }
+    # Execute the graph
+    try:
+        result = graph.invoke(_initial_state(document_text, schema))
+        
+        # Return the extraction result
+        return _final_result(result)
+    except Exception as e:
+        return {"error": f"Extraction flow failed: {str(e)}"}
+
+
+async def arun_extraction_flow(document_text: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the extraction flow without blocking the event loop.
+    
+    The LLM call goes through the async OpenAI client and preprocessing runs
+    in a thread; the other nodes are quick and run directly on the event loop.
+    
+    Args:
+        document_text: Text extracted from the document
+        schema: Data schema to extract
+    
+    Returns:
+        Dict containing the extracted data
+    """
+    # Get the shared graph
+    graph = get_extraction_graph()
     
     # Execute the graph
     try:
-        result = graph.invoke(initial_state)
+        result = await graph.ainvoke(_initial_state(document_text, schema))
         
         # Return the extraction result
-        if "error" in result and result["error"]:
-            return {"error": result["error"]}
-        else:
-            return result["extraction_result"]
+        return _final_result(result)
     except Exception as e:
         return {"error": f"Extraction flow failed: {str(e)}"}
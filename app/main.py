@@ -1,8 +1,12 @@
+import asyncio
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
 from app.api.routes import router as api_router
+from app.core.executor import shutdown_cpu_pool, start_cpu_pool
+from app.langflow.extraction_flow import get_encoding, get_model_name
 
 # Load environment variables
 load_dotenv()
@@ -13,19 +17,40 @@ app = FastAPI(
     version="0.1.0",
 )
 
-# Configure CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Update this in production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Configure CORS for the comma-separated origins in CORS_ORIGINS; same-origin
+# deployments leave it empty and skip the middleware altogether
+cors_origins = [
+    origin.strip() for origin in os.getenv("CORS_ORIGINS", "").split(",") if origin.strip()
+]
+if cors_origins:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=cors_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
 
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
 
+@app.on_event("startup")
+async def startup():
+    """Start the process pool used for OCR and PDF parsing and load the tokenizer."""
+    app.state.cpu_pool = start_cpu_pool(int(os.getenv("CPU_POOL_WORKERS") or 0) or None)
+    
+    # Load the tokenizer in a background thread: it may download its BPE
+    # files, which must neither block the event loop nor delay startup
+    asyncio.get_running_loop().run_in_executor(None, get_encoding, get_model_name())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Shut down the process pool used for OCR and PDF parsing."""
+    shutdown_cpu_pool()
+
+
 @app.get("/")
 async def root():
     """Root endpoint to check if API is running."""
@@ -38,4 +63,21 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    
+    # Auto-reload is for development only and runs a single worker
+    reload = os.getenv("UVICORN_RELOAD", "false").lower() == "true"
+    workers = 1 if reload else int(os.getenv("UVICORN_WORKERS", str(os.cpu_count() or 1)))
+    
+    # Share the cores between the workers' process pools instead of giving each one all of them
+    os.environ.setdefault("CPU_POOL_WORKERS", str(max(1, (os.cpu_count() or 1) // workers)))
+    
+    # "auto" picks uvloop and httptools when they are installed
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="auto",
+        http="auto",
+        workers=workers,
+        reload=reload,
+    )
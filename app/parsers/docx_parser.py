@@ -1,14 +1,13 @@
 import io
 from docx import Document
-from fastapi import UploadFile
 
 
-async def extract_text_from_docx(file: UploadFile) -> str:
+async def extract_text_from_docx(content: bytes) -> str:
     """
     Extract text content from a DOCX file.
     
     Args:
-        file: DOCX file uploaded by the user
+        content: Raw bytes of the DOCX file uploaded by the user
     
     Returns:
         str: Extracted text content
@@ -17,30 +16,19 @@ async def extract_text_from_docx(file: UploadFile) -> str:
         Exception: If there's an error during DOCX processing
     """
     try:
-        # Read the file content
-        content = await file.read()
-        
         # Use python-docx to extract text
         doc = Document(io.BytesIO(content))
         
         # Extract text from paragraphs
-        paragraphs = [p.text for p in doc.paragraphs]
-        text = "\n".join(paragraphs)
+        parts = [p.text for p in doc.paragraphs]
         
-        # Also extract text from tables if present
+        # Also extract text from tables if present, one line per row
         for table in doc.tables:
             for row in table.rows:
-                for cell in row.cells:
-                    text += cell.text + " "
-                text += "\n"
-        
-        # Clean up the text
-        text = text.strip()
-        
-        # Reset file pointer for potential later use
-        await file.seek(0)
+                parts.append(" ".join(cell.text for cell in row.cells))
         
-        return text
+        # Join the parts and clean up the text
+        return "\n".join(parts).strip()
     except Exception as e:
         # Re-raise with more context
         raise Exception(f"Failed to extract text from DOCX: {str(e)}")
@@ -1,15 +1,72 @@
 import io
+import os
+from typing import Any
 from PIL import Image
 import pytesseract
-from fastapi import UploadFile
 
+from app.core.executor import run_cpu_bound
 
-async def extract_text_from_image(file: UploadFile) -> str:
+# Tesseract settings: LSTM engine, uniform block of text per page
+OCR_CONFIG = "--oem 1 --psm 6"
+
+# Wider images are scaled down before OCR; beyond roughly 300 DPI on a page
+# extra pixels only slow Tesseract down
+MAX_OCR_WIDTH = 2000
+
+
+def get_ocr_lang() -> str:
+    """Get the Tesseract language(s) to recognize (OCR_LANG, e.g. "eng+deu")."""
+    return os.getenv("OCR_LANG", "eng")
+
+
+def ocr_image(img: Image.Image, **ocr_kwargs: Any) -> str:
+    """
+    Run OCR on a decoded image.
+    
+    Args:
+        img: PIL image, e.g. a photo or a rendered PDF page
+        **ocr_kwargs: Extra arguments for pytesseract.image_to_string,
+            overriding the default config and language
+    
+    Returns:
+        str: Recognized text
+    """
+    ocr_kwargs = {"config": OCR_CONFIG, "lang": get_ocr_lang(), **ocr_kwargs}
+    
+    # Scale very large images down, keeping the aspect ratio
+    if img.width > MAX_OCR_WIDTH:
+        img.thumbnail((MAX_OCR_WIDTH, img.height), Image.LANCZOS)
+    
+    # Use pytesseract for OCR
+    text = pytesseract.image_to_string(img, **ocr_kwargs)
+    
+    # Clean up the text
+    return text.strip()
+
+
+def ocr_image_bytes(content: bytes, **ocr_kwargs: Any) -> str:
+    """
+    Run OCR on an encoded image.
+    
+    Args:
+        content: Raw image bytes (PNG, JPEG, etc.)
+        **ocr_kwargs: Extra arguments for pytesseract.image_to_string,
+            overriding the default config and language
+    
+    Returns:
+        str: Recognized text
+    """
+    # Open the image using PIL
+    with Image.open(io.BytesIO(content)) as img:
+        return ocr_image(img, **ocr_kwargs)
+
+
+async def extract_text_from_image(content: bytes) -> str:
     """
     Extract text from an image file using OCR (Optical Character Recognition).
     
     Args:
-        file: Image file uploaded by the user
+        content: Raw bytes of the image file uploaded by the user
     
     Returns:
         str: Extracted text content
@@ -18,21 +75,8 @@ async def extract_text_from_image(file: UploadFile) -> str:
         Exception: If there's an error during image processing
     """
     try:
-        # Read the file content
-        content = await file.read()
-        
-        # Open the image using PIL
-        with Image.open(io.BytesIO(content)) as img:
-            # Use pytesseract for OCR
-            text = pytesseract.image_to_string(img)
-            
-            # Clean up the text
-            text = text.strip()
-        
-        # Reset file pointer for potential later use
-        await file.seek(0)
-        
-        return text
+        # Run OCR on the image off the event loop
+        return await run_cpu_bound(ocr_image_bytes, content)
     except Exception as e:
         # Re-raise with more context
         raise Exception(f"Failed to extract text from image: {str(e)}")
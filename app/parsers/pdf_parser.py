@@ -1,14 +1,284 @@
+import asyncio
+import contextlib
+import hashlib
 import io
+import os
+import tempfile
+from collections import OrderedDict
+from typing import Iterator, List, Literal, Optional, Tuple
 import pdfplumber
-from fastapi import UploadFile
+from PIL import Image
 
+from app.core.executor import get_cpu_pool_size, run_cpu_bound
+from app.parsers.image_parser import ocr_image
 
-async def extract_text_from_pdf(file: UploadFile) -> str:
+# PyMuPDF is much faster than pdfplumber for plain text extraction
+try:
+    import pymupdf
+    PYMUPDF_SUPPORT = True
+except ImportError:
+    PYMUPDF_SUPPORT = False
+
+# PDFs with more pages than this are split across worker processes
+PARALLEL_PAGE_THRESHOLD = 4
+
+# Upper bound on worker processes used for page extraction
+MAX_PAGE_WORKERS = 4
+
+# Resolution used when rendering scanned pages for OCR
+OCR_DPI = 200
+
+# When to OCR a PDF: only if it has no text layer, always, or never
+OcrMode = Literal["auto", "on", "off"]
+
+# LRU cache of OCR text, keyed by the PDF's SHA-256 digest and the page index
+_ocr_cache: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+
+
+def _use_pymupdf() -> bool:
+    """Check whether PyMuPDF should be used (PDF_BACKEND=pymupdf, the default)."""
+    return PYMUPDF_SUPPORT and os.getenv("PDF_BACKEND", "pymupdf").lower() == "pymupdf"
+
+
+def _extract_pages_pymupdf(content: bytes) -> List[str]:
+    """
+    Extract the text of every page with PyMuPDF.
+    
+    Args:
+        content: Raw PDF bytes
+    
+    Returns:
+        List[str]: Text of each page, in page order
+    """
+    with pymupdf.open(stream=content, filetype="pdf") as doc:
+        return [page.get_text("text").rstrip() for page in doc]
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """
+    Extract the text of a range of pages (runs in a worker process).
+    
+    Args:
+        path: Path of the PDF file on disk
+        start: Index of the first page to extract
+        stop: Index one past the last page to extract
+    
+    Returns:
+        List[str]: Text of each page in the range
+    """
+    with pdfplumber.open(path) as pdf:
+        return [page.extract_text() or "" for page in pdf.pages[start:stop]]
+
+
+@contextlib.contextmanager
+def _shared_pdf_file(content: bytes) -> Iterator[str]:
+    """
+    Write a PDF to a temp file for worker processes, removing it afterwards.
+    
+    Workers open the PDF from the shared file rather than each receiving the bytes.
+    
+    Args:
+        content: Raw PDF bytes
+    
+    Yields:
+        str: Path of the temp file
+    """
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
+        temp_file.write(content)
+        temp_path = temp_file.name
+    
+    try:
+        yield temp_path
+    finally:
+        os.unlink(temp_path)
+
+
+async def _extract_pages_parallel(content: bytes, page_count: int) -> List[str]:
+    """
+    Extract the text of every page, spreading contiguous page ranges across worker processes.
+    
+    Args:
+        content: Raw PDF bytes
+        page_count: Number of pages in the PDF
+    
+    Returns:
+        List[str]: Text of each page, in page order
+    """
+    with _shared_pdf_file(content) as temp_path:
+        workers = min(os.cpu_count() or 1, MAX_PAGE_WORKERS)
+        step = -(-page_count // workers)  # Ceiling division
+        ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        
+        results = await asyncio.gather(*(
+            run_cpu_bound(_extract_page_range, temp_path, start, stop)
+            for start, stop in ranges
+        ))
+        return [page_text for chunk in results for page_text in chunk]
+
+
+def _extract_small_pdf(content: bytes) -> Tuple[int, Optional[List[str]]]:
+    """
+    Count the pages of a PDF and extract their text if there are only a few.
+    
+    Args:
+        content: Raw PDF bytes
+    
+    Returns:
+        Tuple[int, Optional[List[str]]]: Page count, and the text of each page
+        (None when the PDF is too large to extract in a single worker)
+    """
+    # Use a file-like object for pdfplumber
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        page_count = len(pdf.pages)
+        
+        # Small PDFs are cheaper to extract in a single worker
+        if page_count <= PARALLEL_PAGE_THRESHOLD:
+            return page_count, [page.extract_text() or "" for page in pdf.pages]
+    
+    return page_count, None
+
+
+async def _extract_pages_pdfplumber(content: bytes) -> List[str]:
+    """
+    Extract the text of every page with pdfplumber.
+    
+    Args:
+        content: Raw PDF bytes
+    
+    Returns:
+        List[str]: Text of each page, in page order
+    """
+    page_count, page_texts = await run_cpu_bound(_extract_small_pdf, content)
+    if page_texts is not None:
+        return page_texts
+    
+    # Large PDFs are extracted page range by page range in worker processes
+    return await _extract_pages_parallel(content, page_count)
+
+
+def _is_born_digital(page_texts: List[str]) -> bool:
+    """Check whether a PDF has a text layer, i.e. any page yielded text."""
+    return any(page_text.strip() for page_text in page_texts)
+
+
+def _count_pages(content: bytes) -> int:
+    """Count the pages of a PDF."""
+    if PYMUPDF_SUPPORT:
+        with pymupdf.open(stream=content, filetype="pdf") as doc:
+            return len(doc)
+    
+    with pdfplumber.open(io.BytesIO(content)) as pdf:
+        return len(pdf.pages)
+
+
+def _ocr_page_list(path: str, page_indices: List[int]) -> List[str]:
+    """
+    Render pages of a PDF and OCR them (runs in a worker process).
+    
+    The rendered images stay in the worker; only the text is sent back.
+    
+    Args:
+        path: Path of the PDF file on disk
+        page_indices: Indices of the pages to OCR
+    
+    Returns:
+        List[str]: OCR text of each page, in the order given
+    """
+    if PYMUPDF_SUPPORT:
+        with pymupdf.open(path) as doc:
+            page_texts = []
+            for i in page_indices:
+                pixmap = doc[i].get_pixmap(dpi=OCR_DPI)
+                image = Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+                page_texts.append(ocr_image(image))
+            return page_texts
+    
+    with pdfplumber.open(path) as pdf:
+        return [ocr_image(pdf.pages[i].to_image(resolution=OCR_DPI).original) for i in page_indices]
+
+
+def _get_cached_page_text(digest: str, page_index: int) -> Optional[str]:
+    """Look up the OCR text of a page, or None if it has not been OCRed yet."""
+    key = (digest, page_index)
+    if key not in _ocr_cache:
+        return None
+    _ocr_cache.move_to_end(key)
+    return _ocr_cache[key]
+
+
+def _store_page_text(digest: str, page_index: int, text: str) -> None:
+    """
+    Store the OCR text of a page, evicting the least recently used pages.
+    
+    The cache size in pages is set by OCR_CACHE_SIZE (0 disables caching).
+    
+    Args:
+        digest: SHA-256 hex digest of the PDF
+        page_index: Index of the page in the PDF
+        text: OCR text of the page
+    """
+    max_entries = int(os.getenv("OCR_CACHE_SIZE", "1024"))
+    if max_entries <= 0:
+        return
+    
+    key = (digest, page_index)
+    _ocr_cache[key] = text
+    _ocr_cache.move_to_end(key)
+    while len(_ocr_cache) > max_entries:
+        _ocr_cache.popitem(last=False)
+
+
+def clear_ocr_cache() -> None:
+    """Remove all cached OCR page text."""
+    _ocr_cache.clear()
+
+
+async def _ocr_pages(content: bytes, page_count: Optional[int] = None) -> List[str]:
+    """
+    Extract the text of a scanned PDF, rendering and OCRing its pages in worker processes.
+    
+    Pages OCRed by an earlier request for the same PDF are taken from the cache.
+    
+    Args:
+        content: Raw PDF bytes
+        page_count: Number of pages in the PDF, if already known
+    
+    Returns:
+        List[str]: OCR text of each page, in page order
+    """
+    digest = hashlib.sha256(content).hexdigest()
+    if page_count is None:
+        page_count = await run_cpu_bound(_count_pages, content)
+    
+    page_texts = [_get_cached_page_text(digest, i) for i in range(page_count)]
+    missing = [i for i, page_text in enumerate(page_texts) if page_text is None]
+    
+    # Only OCR the pages we have not seen before, spread across the workers
+    if missing:
+        step = -(-len(missing) // get_cpu_pool_size())  # Ceiling division
+        batches = [missing[start:start + step] for start in range(0, len(missing), step)]
+        
+        with _shared_pdf_file(content) as temp_path:
+            results = await asyncio.gather(*(
+                run_cpu_bound(_ocr_page_list, temp_path, batch) for batch in batches
+            ))
+        
+        for batch, batch_texts in zip(batches, results):
+            for i, page_text in zip(batch, batch_texts):
+                page_texts[i] = page_text
+                _store_page_text(digest, i, page_text)
+    
+    return page_texts
+
+
+async def extract_text_from_pdf(content: bytes, ocr_mode: OcrMode = "auto") -> str:
     """
     Extract text content from a PDF file.
     
     Args:
-        file: PDF file uploaded by the user
+        content: Raw bytes of the PDF file uploaded by the user
+        ocr_mode: "auto" to OCR only scanned PDFs, "on" to always OCR,
+            "off" to never OCR
     
     Returns:
         str: Extracted text content
@@ -17,24 +287,23 @@ async def extract_text_from_pdf(file: UploadFile) -> str:
         Exception: If there's an error during PDF processing
     """
     try:
-        # Read the file content
-        content = await file.read()
+        # Forced OCR ignores the text layer entirely
+        if ocr_mode == "on":
+            return "\n\n".join(await _ocr_pages(content)).strip()
+        
+        # pdfplumber is only used when PyMuPDF is unavailable or disabled; a PDF
+        # without a text layer for PyMuPDF has none for pdfplumber either
+        if _use_pymupdf():
+            page_texts = await run_cpu_bound(_extract_pages_pymupdf, content)
+        else:
+            page_texts = await _extract_pages_pdfplumber(content)
         
-        # Use a file-like object for pdfplumber
-        with pdfplumber.open(io.BytesIO(content)) as pdf:
-            # Extract text from each page and join
-            text = ""
-            for page in pdf.pages:
-                page_text = page.extract_text() or ""
-                text += page_text + "\n\n"
-            
-            # Clean up the text
-            text = text.strip()
-            
-        # Reset file pointer for potential later use
-        await file.seek(0)
+        # Scanned PDFs have no text layer, so their pages go through OCR
+        if ocr_mode == "auto" and not _is_born_digital(page_texts):
+            page_texts = await _ocr_pages(content, len(page_texts))
         
-        return text
+        # Join the pages and clean up the text
+        return "\n\n".join(page_texts).strip()
     except Exception as e:
         # Re-raise with more context
         raise Exception(f"Failed to extract text from PDF: {str(e)}")
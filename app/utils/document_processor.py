@@ -2,8 +2,6 @@
 Document processing utilities for identifying file types and extracting text content.
 """
 from typing import Dict, Any, Tuple, BinaryIO, Optional
-import os
-import tempfile
 import mimetypes
 from pathlib import Path
 import io
@@ -28,6 +26,36 @@ try:
 except ImportError:
     DOCX_SUPPORT = False
 
+try:
+    import magic
+    MAGIC_SUPPORT = True
+except ImportError:
+    MAGIC_SUPPORT = False
+
+# Number of leading bytes needed to identify a file from its content
+SNIFF_HEADER_SIZE = 2048
+
+# Supported file types by the MIME type libmagic reports (images are matched by prefix)
+MIME_FILE_TYPES = {
+    'application/pdf': 'pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'application/zip': 'docx',  # This is approximate, as other Office formats are also ZIP-based
+    'text/plain': 'txt',
+}
+
+# File signatures used when libmagic is not available
+FILE_SIGNATURES = (
+    (b'%PDF', 'pdf'),
+    (b'PK\x03\x04', 'docx'),  # This is approximate, as other Office formats are also ZIP-based
+    (b'\xFF\xD8\xFF', 'image'),  # JPEG
+    (b'\x89PNG\r\n\x1A\n', 'image'),  # PNG
+    (b'GIF87a', 'image'),  # GIF
+    (b'GIF89a', 'image'),  # GIF
+    (b'\x42\x4D', 'image'),  # BMP
+    (b'II*\x00', 'image'),  # TIFF (little-endian)
+    (b'MM\x00*', 'image'),  # TIFF (big-endian)
+)
+
 
 class UnsupportedFileTypeError(Exception):
     """Raised when file type is not supported."""
@@ -39,6 +67,30 @@ class ExtractionError(Exception):
     pass
 
 
+def sniff_file_type(header: bytes) -> Optional[str]:
+    """
+    Identify a file type from the leading bytes of its content.
+    
+    Uses libmagic when available and falls back to known file signatures.
+    
+    Args:
+        header: The first bytes of the file (SNIFF_HEADER_SIZE is enough)
+        
+    Returns:
+        Optional[str]: File type ("pdf", "image", "docx", "txt"), or None if unknown
+    """
+    if MAGIC_SUPPORT:
+        mime_type = magic.from_buffer(header, mime=True)
+        if mime_type.startswith('image/') and mime_type != 'image/svg+xml':
+            return 'image'
+        return MIME_FILE_TYPES.get(mime_type)
+    
+    for signature, file_type in FILE_SIGNATURES:
+        if header.startswith(signature):
+            return file_type
+    return None
+
+
 def identify_file_type(file: BinaryIO) -> str:
     """
     Identify the type of the uploaded file.
@@ -55,8 +107,8 @@ def identify_file_type(file: BinaryIO) -> str:
     # Store current position to restore it later
     current_pos = file.tell()
     
-    # Read first few bytes to detect file signature
-    header = file.read(8)
+    # Read the leading bytes to detect the file type from content
+    header = file.read(SNIFF_HEADER_SIZE)
     file.seek(current_pos)  # Reset position
     
     # Get filename if available
@@ -74,26 +126,14 @@ def identify_file_type(file: BinaryIO) -> str:
             elif mime_type == 'text/plain':
                 return 'txt'
     
-    # Check file signatures as fallback
-    # PDF signature check
-    if header.startswith(b'%PDF'):
-        return 'pdf'
-    # DOCX is a ZIP file with specific contents
-    if header.startswith(b'PK\x03\x04'):
-        return 'docx'  # This is approximate, as other Office formats are also ZIP-based
-    # Common image formats
-    if header.startswith(b'\xFF\xD8\xFF'):  # JPEG
-        return 'image'
-    if header.startswith(b'\x89PNG\r\n\x1A\n'):  # PNG
-        return 'image'
-    if header.startswith(b'GIF87a') or header.startswith(b'GIF89a'):  # GIF
-        return 'image'
-    if header.startswith(b'\x42\x4D'):  # BMP
-        return 'image'
+    # Check file content as fallback
+    if isinstance(header, bytes):
+        file_type = sniff_file_type(header)
+        if file_type:
+            return file_type
+    
     # Text file - check if mostly ASCII
-    file.seek(current_pos)
-    sample = file.read(1024)
-    file.seek(current_pos)
+    sample = header[:1024]
     if isinstance(sample, bytes) and all(b > 8 and b < 127 for b in sample if b != 10 and b != 13):
         return 'txt'
     
@@ -117,21 +157,13 @@ def extract_text_from_pdf(file: BinaryIO) -> str:
         raise ExtractionError("PDF extraction not supported. Please install pdfplumber package.")
     
     try:
-        # Create a temp file to work with pdfplumber
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file.write(file.read())
-            temp_path = temp_file.name
-        
-        # Extract text from all pages
+        # Extract text from all pages, reading the PDF from memory
         text = []
-        with pdfplumber.open(temp_path) as pdf:
+        with pdfplumber.open(io.BytesIO(file.read())) as pdf:
             for page in pdf.pages:
                 page_text = page.extract_text() or ""
                 text.append(page_text)
         
-        # Clean up temp file
-        os.unlink(temp_path)
-        
         return "\n".join(text)
     except Exception as e:
         raise ExtractionError(f"Failed to extract text from PDF: {str(e)}")
@@ -182,18 +214,10 @@ def extract_text_from_docx(file: BinaryIO) -> str:
         raise ExtractionError("DOCX extraction not supported. Please install python-docx package.")
     
     try:
-        # Create a temp file to work with python-docx
-        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-            temp_file.write(file.read())
-            temp_path = temp_file.name
-        
-        # Extract text using python-docx
-        doc = docx.Document(temp_path)
+        # Extract text using python-docx, reading the document from memory
+        doc = docx.Document(io.BytesIO(file.read()))
         paragraphs = [p.text for p in doc.paragraphs]
         
-        # Clean up temp file
-        os.unlink(temp_path)
-        
         return "\n".join(paragraphs)
     except Exception as e:
         raise ExtractionError(f"Failed to extract text from DOCX: {str(e)}")
@@ -0,0 +1,72 @@
+"""
+JSON helpers that use orjson when it is installed and fall back to the standard library.
+"""
+from typing import Any, Union
+import json
+import re
+
+try:
+    import orjson
+    ORJSON_SUPPORT = True
+except ImportError:
+    ORJSON_SUPPORT = False
+
+# orjson.JSONDecodeError subclasses this, so callers can catch one type for both backends
+JSONDecodeError = json.JSONDecodeError
+
+# orjson reads integers of 2**64 and more (20+ digits) as floats, losing digits;
+# documents with a run of 20 digits are decoded with the standard library instead
+_LONG_DIGITS = re.compile(r"[0-9]{20}")
+_LONG_DIGITS_BYTES = re.compile(rb"[0-9]{20}")
+
+
+def _has_long_digits(data: Union[str, bytes]) -> bool:
+    """Check whether JSON data may contain an integer too wide for orjson."""
+    pattern = _LONG_DIGITS_BYTES if isinstance(data, bytes) else _LONG_DIGITS
+    return pattern.search(data) is not None
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Deserialize a JSON document.
+    
+    Args:
+        data: JSON text or bytes
+        
+    Returns:
+        Any: The decoded Python object
+        
+    Raises:
+        JSONDecodeError: If the data is not valid JSON
+    """
+    if ORJSON_SUPPORT and not _has_long_digits(data):
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+    """
+    Serialize an object to a JSON string.
+    
+    Objects orjson cannot serialize (e.g. integers wider than 64 bits) are
+    serialized with the standard library.
+    
+    Args:
+        obj: Object to serialize
+        indent: Pretty-print with two-space indentation
+        sort_keys: Sort dictionary keys, for canonical output
+        
+    Returns:
+        str: The JSON text
+    """
+    if ORJSON_SUPPORT:
+        option = 0
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, option=option).decode("utf-8")
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, indent=2 if indent else None, sort_keys=sort_keys)
@@ -0,0 +1,29 @@
+import json
+from fastapi import BackgroundTasks
+from unittest.mock import AsyncMock, patch
+
+from app.api import routes
+
+# Integer wider than 64 bits, like a long account or invoice number
+WIDE_INTEGER = 2**64 + 12345
+
+
+@patch.object(routes, 'arun_extraction_flow', new_callable=AsyncMock)
+@patch.object(routes, 'process_file', new_callable=AsyncMock)
+@patch.object(routes, 'identify_file_type', return_value="pdf")
+@patch.object(routes, 'read_upload', new_callable=AsyncMock)
+async def test_extract_data_wide_integer(mock_read_upload, mock_identify_file_type, mock_process_file, mock_extraction_flow, upload_file_factory):
+    """Test that extracted integers wider than 64 bits are returned exactly."""
+    mock_read_upload.return_value = b"%PDF-1.4"
+    mock_process_file.return_value = f"Account: {WIDE_INTEGER}"
+    mock_extraction_flow.return_value = {"account": WIDE_INTEGER}
+    
+    response = await routes.extract_data(
+        BackgroundTasks(),
+        file=upload_file_factory("test.pdf"),
+        schema='{"account": "number"}',
+        ocr_mode="auto",
+    )
+    
+    assert response.status_code == 200
+    assert json.loads(response.body) == {"account": WIDE_INTEGER}
@@ -0,0 +1,51 @@
+import pytest
+from fastapi import UploadFile
+from unittest.mock import AsyncMock, NonCallableMock
+
+# Attribute names of UploadFile, collected once for every mock upload.
+# Instance attributes set in __init__ are not visible on the class, so they are added by hand.
+_UPLOAD_FILE_SPEC = sorted(set(dir(UploadFile)) | {"file", "filename", "size", "headers"})
+
+
+@pytest.fixture
+def upload_file_factory():
+    """
+    Create mock UploadFile objects.
+    
+    The mocks are specced from a precomputed attribute list and only get the
+    async methods the code under test uses, which is much cheaper than
+    AsyncMock(spec=UploadFile) or create_autospec walking the class each time.
+    Only read is stubbed: uploads are read once and never rewound, so no code
+    path calls seek.
+    """
+    def make(filename: str = "test", content: bytes = b"") -> NonCallableMock:
+        return NonCallableMock(
+            spec=_UPLOAD_FILE_SPEC,
+            filename=filename,
+            read=AsyncMock(return_value=content),
+        )
+    
+    return make
+
+
+class _CM:
+    """Context manager that hands out a prepared object when entered."""
+    
+    def __init__(self, inner):
+        self.inner = inner
+    
+    def __enter__(self):
+        return self.inner
+    
+    def __exit__(self, *exc_info):
+        return False
+
+
+@pytest.fixture
+def as_context():
+    """
+    Wrap fakes returned by patched open() style calls (pdfplumber.open, Image.open, ...).
+    
+    Avoids configuring __enter__/__exit__ on a MagicMock for every fake document.
+    """
+    return _CM
@@ -0,0 +1,82 @@
+import os
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+
+from app.core.executor import get_cpu_pool, get_cpu_pool_size, run_cpu_bound, shutdown_cpu_pool, start_cpu_pool
+
+
+class UnpicklableError(Exception):
+    """Exception that cannot be unpickled, like pytesseract's TesseractNotFoundError."""
+    
+    def __init__(self):
+        super().__init__("tesseract is not installed")
+
+
+def raise_unpicklable_error():
+    """Worker function failing with an exception the parent cannot unpickle."""
+    raise UnpicklableError()
+
+
+@pytest.fixture(autouse=True)
+def reset_cpu_pool():
+    """Make sure each test starts and ends without a shared pool."""
+    shutdown_cpu_pool()
+    yield
+    shutdown_cpu_pool()
+
+
+async def test_run_cpu_bound_without_pool():
+    """Test that work runs in the default thread pool before the process pool is started."""
+    assert get_cpu_pool() is None
+    assert get_cpu_pool_size() == os.cpu_count()
+    
+    result = await run_cpu_bound(os.getpid)
+    
+    # Threads share the test process
+    assert result == os.getpid()
+
+
+async def test_run_cpu_bound_with_pool():
+    """Test that work runs in a worker process once the pool is started."""
+    pool = start_cpu_pool(max_workers=1)
+    
+    assert get_cpu_pool() is pool
+    assert start_cpu_pool() is pool  # Starting again reuses the running pool
+    assert get_cpu_pool_size() == 1
+    
+    result = await run_cpu_bound(os.getpid)
+    
+    assert result != os.getpid()
+
+
+async def test_run_cpu_bound_unpicklable_error():
+    """Test that a worker error that cannot be unpickled fails only its own call."""
+    pool = start_cpu_pool(max_workers=1)
+    
+    with pytest.raises(RuntimeError, match="tesseract is not installed"):
+        await run_cpu_bound(raise_unpicklable_error)
+    
+    # The pool is still usable
+    assert get_cpu_pool() is pool
+    assert await run_cpu_bound(os.getpid) != os.getpid()
+
+
+async def test_run_cpu_bound_replaces_broken_pool():
+    """Test that the pool is replaced after a worker dies, so later calls still work."""
+    pool = start_cpu_pool(max_workers=1)
+    
+    # The worker exits abruptly, on the first try and on the retry
+    with pytest.raises(BrokenProcessPool):
+        await run_cpu_bound(os._exit, 1)
+    
+    assert await run_cpu_bound(os.getpid) != os.getpid()
+    assert get_cpu_pool() is not pool
+
+
+def test_shutdown_cpu_pool():
+    """Test that shutting down clears the shared pool."""
+    start_cpu_pool(max_workers=1)
+    
+    shutdown_cpu_pool()
+    
+    assert get_cpu_pool() is None
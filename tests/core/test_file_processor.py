@@ -1,128 +1,146 @@
 import pytest
-from fastapi import UploadFile, HTTPException
-from unittest.mock import AsyncMock, patch, MagicMock
+import io
+from fastapi import HTTPException
+from unittest.mock import patch
+from PIL import Image
+from docx import Document
 
-from app.core.file_processor import identify_file_type, process_file
+from app.core.file_processor import identify_file_type, process_file, read_upload
 
+# Raw bytes handed to process_file for each file type
+PDF_PAYLOAD = b"mock pdf content"
+IMAGE_PAYLOAD = b"mock image content"
+DOCX_PAYLOAD = b"mock docx content"
 
-@pytest.fixture
-def mock_pdf_file():
-    """Create a mock PDF file for testing."""
-    file_mock = AsyncMock(spec=UploadFile)
-    file_mock.filename = "test.pdf"
-    return file_mock
-
-
-@pytest.fixture
-def mock_image_file():
-    """Create a mock image file for testing."""
-    file_mock = AsyncMock(spec=UploadFile)
-    file_mock.filename = "test.jpg"
-    return file_mock
+# Pillow formats of the supported image uploads
+IMAGE_FORMATS = ("JPEG", "PNG", "TIFF", "BMP", "GIF")
 
 
 @pytest.fixture
-def mock_docx_file():
-    """Create a mock DOCX file for testing."""
-    file_mock = AsyncMock(spec=UploadFile)
-    file_mock.filename = "test.docx"
-    return file_mock
+def mock_pdf_file(upload_file_factory):
+    """Create a mock PDF file for testing."""
+    return upload_file_factory("test.pdf")
 
 
-@pytest.fixture
-def mock_unsupported_file():
-    """Create a mock unsupported file for testing."""
-    file_mock = AsyncMock(spec=UploadFile)
-    file_mock.filename = "test.txt"
-    return file_mock
+def make_image(image_format: str) -> bytes:
+    """Create a small image in the given Pillow format."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (10, 10), "white").save(buffer, format=image_format)
+    return buffer.getvalue()
 
 
-def test_identify_file_type_pdf(mock_pdf_file):
-    """Test file type identification for PDF files."""
-    file_type = identify_file_type(mock_pdf_file)
-    assert file_type == "pdf"
+def make_docx() -> bytes:
+    """Create a small DOCX document."""
+    buffer = io.BytesIO()
+    document = Document()
+    document.add_paragraph("Hello")
+    document.save(buffer)
+    return buffer.getvalue()
 
 
-def test_identify_file_type_image(mock_image_file):
-    """Test file type identification for image files."""
-    file_type = identify_file_type(mock_image_file)
-    assert file_type == "image"
+@pytest.fixture(params=[True, False], ids=["libmagic", "signatures"])
+def sniff_backend(request):
+    """Run a test with libmagic and with the file-signature fallback."""
+    from app.utils import document_processor
     
-    # Test other image extensions
-    for ext in [".jpeg", ".png", ".tiff", ".bmp", ".gif"]:
-        file = AsyncMock(spec=UploadFile)
-        file.filename = f"test{ext}"
-        assert identify_file_type(file) == "image"
+    if request.param and not document_processor.MAGIC_SUPPORT:
+        pytest.skip("libmagic is not installed")
+    
+    with patch.object(document_processor, "MAGIC_SUPPORT", request.param):
+        yield request.param
 
 
-def test_identify_file_type_docx(mock_docx_file):
-    """Test file type identification for DOCX files."""
-    file_type = identify_file_type(mock_docx_file)
-    assert file_type == "docx"
+@pytest.mark.parametrize("content_factory,expected", [
+    (lambda: b"%PDF-1.4\n%mock pdf content\n", "pdf"),
+    (make_docx, "docx"),
+    *((lambda image_format=image_format: make_image(image_format), "image") for image_format in IMAGE_FORMATS),
+], ids=["pdf", "docx", *IMAGE_FORMATS])
+def test_identify_file_type(content_factory, expected, sniff_backend):
+    """Test file type identification from the file content."""
+    assert identify_file_type(content_factory()) == expected
 
 
-def test_identify_file_type_unsupported(mock_unsupported_file):
-    """Test file type identification for unsupported file types."""
+@pytest.mark.parametrize("content", [b"\x00\x01\x02 binary garbage", b"plain text"])
+def test_identify_file_type_unsupported(content, sniff_backend):
+    """Test that unrecognized content is rejected."""
     with pytest.raises(HTTPException) as excinfo:
-        identify_file_type(mock_unsupported_file)
+        identify_file_type(content)
     
     assert excinfo.value.status_code == 400
     assert "Unsupported file type" in str(excinfo.value.detail)
 
 
-@patch('app.parsers.pdf_parser.extract_text_from_pdf')
-async def test_process_file_pdf(mock_pdf_parser, mock_pdf_file):
+@patch('app.core.file_processor.extract_text_from_pdf')
+async def test_process_file_pdf(mock_pdf_parser):
     """Test file processing for PDF files."""
     mock_pdf_parser.return_value = "Extracted text from PDF"
     
-    result = await process_file(mock_pdf_file, "pdf")
+    result = await process_file(PDF_PAYLOAD, "pdf")
     
-    mock_pdf_parser.assert_called_once_with(mock_pdf_file)
+    mock_pdf_parser.assert_called_once_with(PDF_PAYLOAD, "auto")
     assert result == "Extracted text from PDF"
 
 
-@patch('app.parsers.image_parser.extract_text_from_image')
-async def test_process_file_image(mock_image_parser, mock_image_file):
+@patch('app.core.file_processor.extract_text_from_image')
+async def test_process_file_image(mock_image_parser):
     """Test file processing for image files."""
     mock_image_parser.return_value = "Extracted text from image using OCR"
     
-    result = await process_file(mock_image_file, "image")
+    result = await process_file(IMAGE_PAYLOAD, "image")
     
-    mock_image_parser.assert_called_once_with(mock_image_file)
+    mock_image_parser.assert_called_once_with(IMAGE_PAYLOAD)
     assert result == "Extracted text from image using OCR"
 
 
-@patch('app.parsers.docx_parser.extract_text_from_docx')
-async def test_process_file_docx(mock_docx_parser, mock_docx_file):
+@patch('app.core.file_processor.extract_text_from_docx')
+async def test_process_file_docx(mock_docx_parser):
     """Test file processing for DOCX files."""
     mock_docx_parser.return_value = "Extracted text from DOCX"
     
-    result = await process_file(mock_docx_file, "docx")
+    result = await process_file(DOCX_PAYLOAD, "docx")
     
-    mock_docx_parser.assert_called_once_with(mock_docx_file)
+    mock_docx_parser.assert_called_once_with(DOCX_PAYLOAD)
     assert result == "Extracted text from DOCX"
 
 
 async def test_process_file_unsupported():
     """Test processing of unsupported file type."""
-    file = AsyncMock(spec=UploadFile)
-    
     with pytest.raises(HTTPException) as excinfo:
-        await process_file(file, "unknown")
+        await process_file(b"mock content", "unknown")
     
     assert excinfo.value.status_code == 500
     assert "Unsupported file type" in str(excinfo.value.detail)
 
 
-@patch('app.parsers.pdf_parser.extract_text_from_pdf')
-async def test_process_file_exception(mock_pdf_parser, mock_pdf_file):
+@patch('app.core.file_processor.extract_text_from_pdf')
+async def test_process_file_exception(mock_pdf_parser):
     """Test handling of exception during file processing."""
     # Make parser raise an exception
     mock_pdf_parser.side_effect = Exception("Parsing error")
     
     with pytest.raises(HTTPException) as excinfo:
-        await process_file(mock_pdf_file, "pdf")
+        await process_file(PDF_PAYLOAD, "pdf")
     
     assert excinfo.value.status_code == 500
     assert "Error processing pdf file" in str(excinfo.value.detail)
     assert "Parsing error" in str(excinfo.value.detail)
+
+
+async def test_read_upload_within_limit(mock_pdf_file):
+    """Test that an upload under the size limit is read in full."""
+    mock_pdf_file.read.side_effect = [b"chunk 1 ", b"chunk 2", b""]
+    
+    result = await read_upload(mock_pdf_file, max_size=1024)
+    
+    assert result == b"chunk 1 chunk 2"
+
+
+async def test_read_upload_exceeds_limit(mock_pdf_file):
+    """Test that reading stops as soon as the size limit is crossed."""
+    mock_pdf_file.read.side_effect = [b"x" * 600, b"x" * 600, b"x" * 600, b""]
+    
+    with pytest.raises(HTTPException) as excinfo:
+        await read_upload(mock_pdf_file, max_size=1024)
+    
+    assert excinfo.value.status_code == 413
+    assert mock_pdf_file.read.call_count == 2
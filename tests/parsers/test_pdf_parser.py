@@ -1,80 +1,301 @@
+import os
 import pytest
-from fastapi import UploadFile
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
-import io
 
-from app.parsers.pdf_parser import extract_text_from_pdf
+from app.parsers.pdf_parser import (
+    extract_text_from_pdf,
+    _extract_page_range,
+    _ocr_page_list,
+    _ocr_pages,
+    clear_ocr_cache,
+    PARALLEL_PAGE_THRESHOLD
+)
 
+# Raw bytes handed to the parser in place of a real PDF
+PDF_PAYLOAD = b"mock pdf content"
 
-@pytest.fixture
-def mock_pdf_file():
-    """Create a mock PDF file for testing."""
-    # Create a mock UploadFile object
-    file_mock = AsyncMock(spec=UploadFile)
-    file_mock.filename = "test.pdf"
-    
-    # Mock the read and seek methods
-    file_mock.read.return_value = b"mock pdf content"
-    file_mock.seek.return_value = None
-    
-    return file_mock
+
+@pytest.fixture(autouse=True)
+def pdfplumber_backend(monkeypatch):
+    """Use the pdfplumber backend unless a test opts into PyMuPDF."""
+    monkeypatch.setenv("PDF_BACKEND", "pdfplumber")
+
+
+@pytest.fixture(autouse=True)
+def empty_ocr_cache():
+    """Make sure each test starts without cached OCR pages."""
+    clear_ocr_cache()
+    yield
+    clear_ocr_cache()
 
 
 @patch('pdfplumber.open')
-async def test_extract_text_from_pdf_success(mock_pdf_open, mock_pdf_file):
+async def test_extract_text_from_pdf_success(mock_pdf_open, as_context):
     """Test successful text extraction from PDF."""
-    # Set up the mock PDF object and pages
-    mock_page = MagicMock()
-    mock_page.extract_text.return_value = "This is test content from the PDF."
-    
-    mock_pdf = MagicMock()
-    mock_pdf.pages = [mock_page]
-    mock_pdf.__enter__.return_value = mock_pdf
-    
-    mock_pdf_open.return_value = mock_pdf
+    # Set up the fake PDF object and pages
+    page = SimpleNamespace(extract_text=lambda: "This is test content from the PDF.")
+    mock_pdf_open.return_value = as_context(SimpleNamespace(pages=[page]))
     
     # Call the function
-    result = await extract_text_from_pdf(mock_pdf_file)
+    result = await extract_text_from_pdf(PDF_PAYLOAD)
     
     # Verify expectations
-    mock_pdf_file.read.assert_called_once()
-    mock_pdf_file.seek.assert_called_once_with(0)
     mock_pdf_open.assert_called_once()
-    mock_page.extract_text.assert_called_once()
     
     assert "This is test content from the PDF." in result
     assert result.strip() == "This is test content from the PDF."
 
 
+@pytest.mark.parametrize("n_pages", [1, 10, 100])
 @patch('pdfplumber.open')
-async def test_extract_text_from_pdf_empty_page(mock_pdf_open, mock_pdf_file):
+async def test_extract_text_from_pdf_batched(mock_pdf_open, n_pages, as_context):
+    """Test that every page is extracted once and joined in page order."""
+    pages = [SimpleNamespace(extract_text=lambda i=i: f"page {i}") for i in range(n_pages)]
+    mock_pdf_open.return_value = as_context(SimpleNamespace(pages=pages))
+    
+    # Call the function (large PDFs go through the page-range workers)
+    result = await extract_text_from_pdf(PDF_PAYLOAD)
+    
+    assert result.count("page ") == n_pages
+    assert result == "\n\n".join(f"page {i}" for i in range(n_pages))
+
+
+@patch('app.parsers.pdf_parser._ocr_pages', new_callable=AsyncMock)
+@patch('pdfplumber.open')
+async def test_extract_text_from_pdf_empty_page(mock_pdf_open, mock_ocr_pages, as_context):
     """Test extraction from PDF with empty page."""
     # Set up the mock PDF object with page that returns None (empty)
     mock_page = MagicMock()
     mock_page.extract_text.return_value = None
     
-    mock_pdf = MagicMock()
-    mock_pdf.pages = [mock_page]
-    mock_pdf.__enter__.return_value = mock_pdf
+    mock_pdf_open.return_value = as_context(SimpleNamespace(pages=[mock_page]))
     
-    mock_pdf_open.return_value = mock_pdf
+    # OCR finds nothing either
+    mock_ocr_pages.return_value = [""]
     
     # Call the function
-    result = await extract_text_from_pdf(mock_pdf_file)
+    result = await extract_text_from_pdf(PDF_PAYLOAD)
     
     # Verify result is an empty string after stripping
     assert result == ""
 
 
+@patch('app.parsers.pdf_parser._ocr_pages', new_callable=AsyncMock)
+@patch('pdfplumber.open')
+async def test_extract_text_from_pdf_scanned(mock_pdf_open, mock_ocr_pages, as_context):
+    """Test that PDFs without a text layer are routed to OCR."""
+    # Set up a mock PDF whose pages have no extractable text
+    mock_page = MagicMock()
+    mock_page.extract_text.return_value = None
+    
+    mock_pdf_open.return_value = as_context(SimpleNamespace(pages=[mock_page, mock_page]))
+    
+    mock_ocr_pages.return_value = ["Scanned page 1", "Scanned page 2"]
+    
+    # Call the function
+    result = await extract_text_from_pdf(PDF_PAYLOAD)
+    
+    mock_ocr_pages.assert_called_once_with(PDF_PAYLOAD, 2)
+    assert result == "Scanned page 1\n\nScanned page 2"
+
+
+@patch('app.parsers.pdf_parser._ocr_pages', new_callable=AsyncMock)
+@patch('pdfplumber.open')
+async def test_extract_text_from_pdf_born_digital_skips_ocr(mock_pdf_open, mock_ocr_pages, as_context):
+    """Test that PDFs with a text layer never go through OCR."""
+    # Only one of the pages has text
+    text_page = MagicMock()
+    text_page.extract_text.return_value = "Digital text"
+    empty_page = MagicMock()
+    empty_page.extract_text.return_value = None
+    
+    mock_pdf_open.return_value = as_context(SimpleNamespace(pages=[text_page, empty_page]))
+    
+    # Call the function
+    result = await extract_text_from_pdf(PDF_PAYLOAD)
+    
+    mock_ocr_pages.assert_not_called()
+    assert result == "Digital text"
+
+
+@patch('app.parsers.pdf_parser._ocr_pages', new_callable=AsyncMock)
+@patch('pdfplumber.open')
+async def test_extract_text_from_pdf_ocr_off(mock_pdf_open, mock_ocr_pages, as_context):
+    """Test that OCR can be disabled for scanned PDFs."""
+    mock_page = MagicMock()
+    mock_page.extract_text.return_value = None
+    
+    mock_pdf_open.return_value = as_context(SimpleNamespace(pages=[mock_page]))
+    
+    # Call the function
+    result = await extract_text_from_pdf(PDF_PAYLOAD, ocr_mode="off")
+    
+    mock_ocr_pages.assert_not_called()
+    assert result == ""
+
+
+@patch('app.parsers.pdf_parser._ocr_pages', new_callable=AsyncMock)
+@patch('pdfplumber.open')
+async def test_extract_text_from_pdf_ocr_on(mock_pdf_open, mock_ocr_pages):
+    """Test that forced OCR skips the text layer."""
+    mock_ocr_pages.return_value = ["OCR page 1", "OCR page 2"]
+    
+    # Call the function
+    result = await extract_text_from_pdf(PDF_PAYLOAD, ocr_mode="on")
+    
+    mock_pdf_open.assert_not_called()
+    mock_ocr_pages.assert_called_once_with(PDF_PAYLOAD)
+    assert result == "OCR page 1\n\nOCR page 2"
+
+
 @patch('pdfplumber.open')
-async def test_extract_text_from_pdf_exception(mock_pdf_open, mock_pdf_file):
+async def test_extract_text_from_pdf_exception(mock_pdf_open):
     """Test handling of exception during PDF extraction."""
     # Make pdfplumber.open raise an exception
     mock_pdf_open.side_effect = Exception("PDF processing error")
     
     # Check that the exception is properly propagated
     with pytest.raises(Exception) as excinfo:
-        await extract_text_from_pdf(mock_pdf_file)
+        await extract_text_from_pdf(PDF_PAYLOAD)
     
     assert "Failed to extract text from PDF" in str(excinfo.value)
     assert "PDF processing error" in str(excinfo.value)
+
+
+@patch('app.parsers.pdf_parser._extract_pages_parallel', new_callable=AsyncMock)
+@patch('pdfplumber.open')
+async def test_extract_text_from_pdf_large_document(mock_pdf_open, mock_parallel, as_context):
+    """Test that PDFs above the page threshold are extracted in worker processes."""
+    # Set up a mock PDF with more pages than the in-process threshold
+    pages = [MagicMock() for _ in range(PARALLEL_PAGE_THRESHOLD + 1)]
+    mock_pdf_open.return_value = as_context(SimpleNamespace(pages=pages))
+    
+    mock_parallel.return_value = ["Page 1", "", "Page 3", "Page 4", "Page 5"]
+    
+    # Call the function
+    result = await extract_text_from_pdf(PDF_PAYLOAD)
+    
+    # Pages should come from the worker path, not in-process extraction
+    mock_parallel.assert_called_once_with(PDF_PAYLOAD, PARALLEL_PAGE_THRESHOLD + 1)
+    for page in pages:
+        page.extract_text.assert_not_called()
+    
+    assert result == "Page 1\n\n\n\nPage 3\n\nPage 4\n\nPage 5"
+
+
+@patch('pdfplumber.open')
+def test_extract_page_range(mock_pdf_open, as_context):
+    """Test extraction of a page range as done by worker processes."""
+    pages = [MagicMock() for _ in range(4)]
+    for i, page in enumerate(pages):
+        page.extract_text.return_value = f"Page {i + 1}" if i != 2 else None
+    
+    mock_pdf_open.return_value = as_context(SimpleNamespace(pages=pages))
+    
+    result = _extract_page_range("/tmp/test.pdf", 1, 3)
+    
+    mock_pdf_open.assert_called_once_with("/tmp/test.pdf")
+    assert result == ["Page 2", ""]
+
+
+@patch('app.parsers.pdf_parser.PYMUPDF_SUPPORT', True)
+@patch('app.parsers.pdf_parser.pymupdf', create=True)
+@patch('pdfplumber.open')
+async def test_extract_text_from_pdf_pymupdf(mock_pdf_open, mock_pymupdf, monkeypatch, as_context):
+    """Test that PyMuPDF is used when selected and finds text."""
+    monkeypatch.setenv("PDF_BACKEND", "pymupdf")
+    
+    # Set up the mock PyMuPDF document
+    pages = [MagicMock(), MagicMock()]
+    pages[0].get_text.return_value = "Page 1 text\n"
+    pages[1].get_text.return_value = "Page 2 text\n"
+    mock_pymupdf.open.return_value = as_context(pages)
+    
+    # Call the function
+    result = await extract_text_from_pdf(PDF_PAYLOAD)
+    
+    # pdfplumber should not be touched
+    mock_pymupdf.open.assert_called_once_with(stream=PDF_PAYLOAD, filetype="pdf")
+    mock_pdf_open.assert_not_called()
+    
+    assert result == "Page 1 text\n\nPage 2 text"
+
+
+@patch('app.parsers.pdf_parser._ocr_pages', new_callable=AsyncMock)
+@patch('app.parsers.pdf_parser.PYMUPDF_SUPPORT', True)
+@patch('app.parsers.pdf_parser.pymupdf', create=True)
+@patch('pdfplumber.open')
+async def test_extract_text_from_pdf_pymupdf_scanned(mock_pdf_open, mock_pymupdf, mock_ocr_pages, monkeypatch, as_context):
+    """Test that a PDF without text for PyMuPDF goes straight to OCR, skipping pdfplumber."""
+    monkeypatch.setenv("PDF_BACKEND", "pymupdf")
+    
+    # PyMuPDF returns only whitespace
+    empty_page = MagicMock()
+    empty_page.get_text.return_value = "  \n"
+    mock_pymupdf.open.return_value = as_context([empty_page])
+    
+    mock_ocr_pages.return_value = ["Scanned page"]
+    
+    # Call the function
+    result = await extract_text_from_pdf(PDF_PAYLOAD)
+    
+    mock_pdf_open.assert_not_called()
+    mock_ocr_pages.assert_called_once_with(PDF_PAYLOAD, 1)
+    assert result == "Scanned page"
+
+
+def fake_ocr_page_list(path, page_indices):
+    """Stand-in for the OCR worker that names each page it was asked for."""
+    return [f"Page {i + 1}" for i in page_indices]
+
+
+@patch('app.parsers.pdf_parser._ocr_page_list', side_effect=fake_ocr_page_list)
+async def test_ocr_pages_in_workers(mock_ocr_page_list):
+    """Test that workers OCR every page from a shared temp file and return only text."""
+    result = await _ocr_pages(PDF_PAYLOAD, 5)
+    
+    # Every page is OCRed exactly once, from a temp file removed afterwards
+    paths = {call.args[0] for call in mock_ocr_page_list.call_args_list}
+    pages = [i for call in mock_ocr_page_list.call_args_list for i in call.args[1]]
+    assert len(paths) == 1 and not os.path.exists(paths.pop())
+    assert sorted(pages) == [0, 1, 2, 3, 4]
+    assert result == ["Page 1", "Page 2", "Page 3", "Page 4", "Page 5"]
+
+
+@patch('app.parsers.pdf_parser.get_cpu_pool_size', return_value=2)
+@patch('app.parsers.pdf_parser._ocr_page_list', side_effect=fake_ocr_page_list)
+async def test_ocr_pages_batches_per_pool_worker(mock_ocr_page_list, mock_pool_size):
+    """Test that pages are split into one batch per pool worker, not per CPU."""
+    await _ocr_pages(PDF_PAYLOAD, 5)
+    
+    assert [call.args[1] for call in mock_ocr_page_list.call_args_list] == [[0, 1, 2], [3, 4]]
+
+
+@patch('app.parsers.pdf_parser._ocr_page_list', side_effect=fake_ocr_page_list)
+async def test_ocr_pages_cached(mock_ocr_page_list):
+    """Test that pages OCRed once are not OCRed again for the same PDF."""
+    first = await _ocr_pages(PDF_PAYLOAD, 2)
+    calls = mock_ocr_page_list.call_count
+    second = await _ocr_pages(PDF_PAYLOAD, 2)
+    
+    assert mock_ocr_page_list.call_count == calls
+    assert first == second == ["Page 1", "Page 2"]
+
+
+@patch('app.parsers.pdf_parser.PYMUPDF_SUPPORT', False)
+@patch('app.parsers.pdf_parser.ocr_image')
+@patch('pdfplumber.open')
+def test_ocr_page_list(mock_pdf_open, mock_ocr_image, as_context):
+    """Test that a worker renders and OCRs the pages it is given, in order."""
+    pages = [
+        SimpleNamespace(to_image=lambda resolution, i=i: SimpleNamespace(original=f"image {i}"))
+        for i in range(3)
+    ]
+    mock_pdf_open.return_value = as_context(SimpleNamespace(pages=pages))
+    mock_ocr_image.side_effect = lambda image: f"text of {image}"
+    
+    result = _ocr_page_list("/tmp/test.pdf", [2, 0])
+    
+    mock_pdf_open.assert_called_once_with("/tmp/test.pdf")
+    assert result == ["text of image 2", "text of image 0"]
@@ -1,20 +1,15 @@
 import pytest
 from app.schemas.validation import validate_schema
 
+# Field types a schema may declare
+VALID_FIELD_TYPES = frozenset({"string", "number", "boolean", "object", "array", "date"})
 
-def test_valid_schema():
-    """Test that a valid schema passes validation."""
-    schema = {
-        "name": "string",
-        "age": "number",
-        "is_active": "boolean",
-        "address": "object",
-        "tags": "array",
-        "birth_date": "date"
-    }
-    
+
+@pytest.mark.parametrize("field_type", sorted(VALID_FIELD_TYPES))
+def test_valid_field_type(field_type):
+    """Test that every supported field type passes validation."""
     # Should not raise any exception
-    validate_schema(schema)
+    validate_schema({"field": field_type})
 
 
 def test_empty_schema():
@@ -55,16 +50,11 @@ def test_invalid_field_name():
     assert "Field name must be a non-empty string" in str(excinfo.value)
 
 
-def test_invalid_field_type():
+@pytest.mark.parametrize("field_type", ["integer", "bool", "int", "float", ""])
+def test_invalid_field_type(field_type):
     """Test that invalid field types raise ValueError."""
-    schema = {
-        "name": "string",
-        "age": "integer",  # Not in valid_types
-        "active": "bool"   # Not in valid_types
-    }
-    
     with pytest.raises(ValueError) as excinfo:
-        validate_schema(schema)
+        validate_schema({"field": field_type})
     
     assert "has invalid type" in str(excinfo.value)
     assert "Supported types are:" in str(excinfo.value)
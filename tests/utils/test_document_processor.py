@@ -0,0 +1,49 @@
+import io
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from docx import Document
+
+from app.utils.document_processor import (
+    extract_text_from_docx,
+    extract_text_from_pdf,
+    ExtractionError,
+)
+
+
+def make_docx_file() -> io.BytesIO:
+    """Create a small in-memory DOCX document."""
+    buffer = io.BytesIO()
+    document = Document()
+    document.add_paragraph("Hello")
+    document.add_paragraph("World")
+    document.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+@patch('tempfile.NamedTemporaryFile')
+def test_extract_text_from_docx_in_memory(mock_temp_file):
+    """Test that DOCX text is extracted without writing a temp file."""
+    result = extract_text_from_docx(make_docx_file())
+    
+    mock_temp_file.assert_not_called()
+    assert result == "Hello\nWorld"
+
+
+@patch('pdfplumber.open')
+def test_extract_text_from_pdf_in_memory(mock_pdf_open, as_context):
+    """Test that the PDF is opened from memory rather than a temp file."""
+    mock_pdf_open.return_value = as_context(SimpleNamespace(pages=[]))
+    
+    extract_text_from_pdf(io.BytesIO(b"%PDF-1.4 mock"))
+    
+    source = mock_pdf_open.call_args.args[0]
+    assert isinstance(source, io.BytesIO)
+    assert source.getvalue() == b"%PDF-1.4 mock"
+
+
+def test_extract_text_from_pdf_invalid():
+    """Test that unreadable PDFs raise ExtractionError."""
+    with pytest.raises(ExtractionError):
+        extract_text_from_pdf(io.BytesIO(b"not a pdf"))
@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import patch
+
+from app.utils import json_utils
+
+
+@pytest.fixture(params=[True, False], ids=["orjson", "stdlib"])
+def backend(request):
+    """Run a test with and without orjson."""
+    if request.param and not json_utils.ORJSON_SUPPORT:
+        pytest.skip("orjson is not installed")
+    
+    with patch.object(json_utils, "ORJSON_SUPPORT", request.param):
+        yield request.param
+
+
+def test_loads(backend):
+    """Test decoding JSON text and bytes."""
+    assert json_utils.loads('{"name": "string"}') == {"name": "string"}
+    assert json_utils.loads(b'{"age": 35}') == {"age": 35}
+
+
+def test_loads_invalid(backend):
+    """Test that invalid JSON raises the shared decode error."""
+    with pytest.raises(json_utils.JSONDecodeError):
+        json_utils.loads("not json")
+
+
+def test_dumps_indent(backend):
+    """Test pretty-printed output."""
+    assert json_utils.dumps({"name": "string"}, indent=True) == '{\n  "name": "string"\n}'
+
+
+def test_dumps_sort_keys(backend):
+    """Test that sorted output is the same for any key order."""
+    first = json_utils.dumps({"b": 1, "a": 2}, sort_keys=True)
+    second = json_utils.dumps({"a": 2, "b": 1}, sort_keys=True)
+    
+    assert first == second
+    assert json_utils.loads(first) == {"a": 2, "b": 1}
+
+
+def test_loads_wide_integer(backend):
+    """Test that integers wider than 64 bits are decoded exactly, not as floats."""
+    number = 2**64 + 12345
+    
+    assert json_utils.loads(f'{{"account": {number}}}') == {"account": number}
+    assert json_utils.loads(f'{{"account": {number}}}'.encode()) == {"account": number}
+
+
+def test_dumps_wide_integer(backend):
+    """Test that integers wider than 64 bits can be serialized."""
+    number = 2**64 + 12345
+    
+    assert json_utils.loads(json_utils.dumps({"account": number})) == {"account": number}